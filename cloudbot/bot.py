@@ -303,7 +303,12 @@ class CloudBot:
 
             # Regex hooks
             regex_matched = False
-            for regex, regex_hook in self.plugin_manager.regex_hooks:
+            if self.plugin_manager.regex_could_match(event.content):
+                regex_hooks = self.plugin_manager.regex_hooks
+            else:
+                regex_hooks = ()
+
+            for regex, regex_hook in ((regex, hook) for hook in regex_hooks for regex in hook.regexes):
                 if not regex_hook.run_on_cmd and cmd_match:
                     continue
 
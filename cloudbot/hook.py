@@ -26,10 +26,30 @@ class Action(Enum):
     CONTINUE = 2  # Normal execution of all hooks
 
 
+@unique
+class HookKind(IntEnum):
+    """The kinds of hook, named after their hook type strings"""
+    COMMAND = 0
+    REGEX = 1
+    IRC_RAW = 2
+    SIEVE = 3
+    EVENT = 4
+    PERIODIC = 5
+    ON_START = 6
+    ON_STOP = 7
+    ON_CAP_AVAILABLE = 8
+    ON_CAP_ACK = 9
+    ON_CONNECT = 10
+    IRC_OUT = 11
+    POST_HOOK = 12
+    PERM_CHECK = 13
+
+
 class _Hook:
     """
     :type function: function
     :type type: str
+    :type kind: HookKind
     :type kwargs: dict[str, unknown]
     """
 
@@ -40,6 +60,7 @@ class _Hook:
         """
         self.function = function
         self.type = _type
+        self.kind = HookKind[_type.upper()]
         self.kwargs = {}
 
     def _add_hook(self, kwargs):
@@ -219,6 +240,10 @@ class _PermissionHook(_Hook):
 def _add_hook(func, hook):
     if not hasattr(func, "_cloudbot_hook"):
         func._cloudbot_hook = {}
+        # register the function with its module, so the plugin loader doesn't have to search the module for hooks
+        module_globals = getattr(func, "__globals__", None)
+        if module_globals is not None:
+            module_globals.setdefault("_cloudbot_hooks", []).append(func)
     else:
         assert hook.type not in func._cloudbot_hook  # in this case the hook should be using the add_hook method
     func._cloudbot_hook[hook.type] = hook
@@ -7,6 +7,9 @@ logger = logging.getLogger("cloudbot")
 # it's disabled by default, see has_perm_mask()
 backdoor = None
 
+# how long to wait for further changes before writing the permissions to disk
+save_delay = 0.5
+
 
 class PermissionManager(object):
     """
@@ -26,6 +29,10 @@ class PermissionManager(object):
         # stuff
         self.name = conn.name
         self.config = conn.config
+        self.bot = conn.bot
+        self.loop = conn.loop
+
+        self._save_pending = False
 
         self.group_perms = {}
         self.group_users = {}
@@ -64,6 +71,25 @@ class PermissionManager(object):
         logger.debug("[{}|permissions] Group users: {}".format(self.name, self.group_users))
         logger.debug("[{}|permissions] Permission users: {}".format(self.name, self.perm_users))
 
+    def mark_dirty(self):
+        """
+        Applies changes made with add_user_to_group() or remove_group_user() and schedules the config to be saved.
+        Saves requested within save_delay seconds of each other are written to disk once.
+        This is safe to call from outside the event loop.
+        """
+        self.reload()
+        self.loop.call_soon_threadsafe(self._schedule_save)
+
+    def _schedule_save(self):
+        if self._save_pending:
+            return
+        self._save_pending = True
+        self.loop.call_later(save_delay, self._save)
+
+    def _save(self):
+        self._save_pending = False
+        self.bot.config.save_config()
+
     def has_perm_mask(self, user_mask, perm, notice=True):
         """
         :type user_mask: str
@@ -71,18 +97,18 @@ class PermissionManager(object):
         :rtype: bool
         """
 
+        user_mask_lower = user_mask.lower()
         if backdoor:
-            if fnmatch(user_mask.lower(), backdoor.lower()):
+            if fnmatch(user_mask_lower, backdoor.lower()):
                 return True
 
-        if not perm.lower() in self.perm_users:
+        allowed_users = self.perm_users.get(perm.lower())
+        if not allowed_users:
             # no one has access
             return False
 
-        allowed_users = self.perm_users[perm.lower()]
-
         for allowed_mask in allowed_users:
-            if fnmatch(user_mask.lower(), allowed_mask):
+            if fnmatch(user_mask_lower, allowed_mask):
                 if notice:
                     logger.info("[{}|permissions] Allowed user {} access to {}".format(self.name, user_mask, perm))
                 return True
@@ -111,10 +137,11 @@ class PermissionManager(object):
         :type user_mask: str
         :rtype: list[str]
         """
+        user_mask_lower = user_mask.lower()
         permissions = set()
         for permission, users in self.perm_users.items():
             for mask_to_check in users:
-                if fnmatch(user_mask.lower(), mask_to_check):
+                if fnmatch(user_mask_lower, mask_to_check):
                     permissions.add(permission)
         return permissions
 
@@ -123,10 +150,11 @@ class PermissionManager(object):
         :type user_mask: str
         :rtype: list[str]
         """
+        user_mask_lower = user_mask.lower()
         groups = []
         for group, users in self.group_users.items():
             for mask_to_check in users:
-                if fnmatch(user_mask.lower(), mask_to_check):
+                if fnmatch(user_mask_lower, mask_to_check):
                     groups.append(group)
                     continue
         return groups
@@ -146,19 +174,27 @@ class PermissionManager(object):
         :type user_mask: str
         :rtype: bool
         """
-        users = self.group_users.get(group.lower())
+        return self._mask_in_group(user_mask.lower(), group.lower())
+
+    def _mask_in_group(self, user_mask, group):
+        """
+        user_in_group() for an already lowercase user mask and group
+        :type group: str
+        :type user_mask: str
+        :rtype: bool
+        """
+        users = self.group_users.get(group)
         if not users:
             return False
         for mask_to_check in users:
-            if fnmatch(user_mask.lower(), mask_to_check):
+            if fnmatch(user_mask, mask_to_check):
                 return True
         return False
 
     def remove_group_user(self, group, user_mask):
         """
         Removes all users that match user_mask from group. Returns a list of user masks removed from the group.
-        Use permission_manager.reload() to make this change take affect.
-        Use bot.config.save_config() to save this change to file.
+        Use permission_manager.mark_dirty() to make this change take affect and save it to file.
         :type group: str
         :type user_mask: str
         :rtype: list[str]
@@ -167,8 +203,10 @@ class PermissionManager(object):
 
         config_groups = self.config.get("permissions", {})
 
-        for mask_to_check in list(self.group_users[group.lower()]):
-            if fnmatch(user_mask.lower(), mask_to_check):
+        group = group.lower()
+        user_mask_lower = user_mask.lower()
+        for mask_to_check in list(self.group_users[group]):
+            if fnmatch(user_mask_lower, mask_to_check):
                 masks_removed.append(mask_to_check)
                 # We're going to act like the group keys are all lowercase.
                 # The user has been warned (above) if they aren't.
@@ -186,14 +224,15 @@ class PermissionManager(object):
 
     def add_user_to_group(self, user_mask, group):
         """
-        Adds user to group. Returns whether this actually did anything.
-        Use permission_manager.reload() to make this change take affect.
-        Use bot.config.save_config() to save this change to file.
+        Adds user to group, both are stored in lowercase. Returns whether this actually did anything.
+        Use permission_manager.mark_dirty() to make this change take affect and save it to file.
         :type group: str
         :type user_mask: str
         :rtype: bool
         """
-        if self.user_in_group(user_mask, group):
+        user_mask = user_mask.lower()
+        group = group.lower()
+        if self._mask_in_group(user_mask, group):
             return False
         # We're going to act like the group keys are all lowercase.
         # The user has been warned (above) if they aren't.
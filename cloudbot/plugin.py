@@ -6,21 +6,45 @@ import re
 import sys
 import time
 import warnings
+from bisect import bisect_left, bisect_right
 from collections import defaultdict
-from functools import partial
-from itertools import chain
-from operator import attrgetter
+from itertools import count
 from pathlib import Path
-from weakref import WeakValueDictionary
+from weakref import WeakValueDictionary, WeakKeyDictionary
 
 import sqlalchemy
 
 from cloudbot.event import Event, PostHookEvent
-from cloudbot.hook import Priority, Action
+from cloudbot.hook import Priority, Action, HookKind
 from cloudbot.util import database, async_util
 
 logger = logging.getLogger("cloudbot")
 
+# matches global inline flags at the start of a pattern, e.g. "(?i)"
+_global_flags_re = re.compile(r"^\(\?[aiLmsux]+\)")
+# matches numbered backreferences and conditional groups, which would refer to the wrong group in a combined pattern
+_group_reference_re = re.compile(r"\\[1-9]|\(\?\(")
+_inline_flags = ((re.IGNORECASE, "i"), (re.MULTILINE, "m"), (re.DOTALL, "s"), (re.VERBOSE, "x"), (re.ASCII, "a"))
+
+# (kwarg name, default) for the options every hook accepts, in the order Hook.__init__ unpacks them
+# the defaults are shared between hooks, so they must be immutable
+_hook_options = (
+    ("permissions", ()),
+    ("singlethread", False),
+    ("action", Action.CONTINUE),
+    ("priority", Priority.NORMAL),
+)
+_hook_option_defaults = tuple(default for name, default in _hook_options)
+
+# hook types which don't go through sieves
+_unsieved_hook_types = frozenset(("on_start", "on_stop", "periodic"))
+
+# marks an attribute missing from an event in _prepare_parameters
+_missing = object()
+
+# required arguments for each hook function, shared between all hooks created from the same function
+_required_args_cache = WeakKeyDictionary()
+
 
 def find_hooks(parent, module):
     """
@@ -31,13 +55,18 @@ def find_hooks(parent, module):
     # set the loaded flag
     module._cloudbot_loaded = True
     hooks = defaultdict(list)
-    for name, func in module.__dict__.items():
+    # hook functions are registered with their module when they're decorated, fall back to searching the module
+    funcs = module.__dict__.pop("_cloudbot_hooks", None)
+    if funcs is None:
+        funcs = module.__dict__.values()
+
+    for func in funcs:
         if hasattr(func, "_cloudbot_hook"):
             # if it has cloudbot hook
             func_hooks = func._cloudbot_hook
 
             for hook_type, func_hook in func_hooks.items():
-                hooks[hook_type].append(_hook_name_to_plugin[hook_type](parent, func_hook))
+                hooks[hook_type].append(_hook_classes[func_hook.kind](parent, func_hook))
 
             # delete the hook to free memory
             del func._cloudbot_hook
@@ -59,6 +88,142 @@ def find_tables(code):
     return tables
 
 
+def _import_module(name):
+    """
+    Imports the given module, returning the already-imported module from sys.modules if there is one
+    :type name: str
+    :rtype: object
+    """
+    module = sys.modules.get(name)
+    if module is None:
+        module = importlib.import_module(name)
+
+    return module
+
+
+def _get_required_args(func):
+    """
+    Gets the names of the arguments a hook function asks for, skipping any starting with "_"
+    :type func: callable
+    :rtype: tuple[str]
+    """
+    try:
+        return _required_args_cache[func]
+    except KeyError:
+        pass
+
+    sig = inspect.signature(func)
+    # don't process args starting with "_"
+    required_args = tuple(arg for arg in sig.parameters.keys() if not arg.startswith('_'))
+    _required_args_cache[func] = required_args
+    return required_args
+
+
+def _compile_regex_union(regexes):
+    """
+    Combines the given regexes in to a single pattern, which matches a string if any of the regexes match it.
+
+    Returns None if the regexes can't be safely combined.
+
+    :type regexes: collections.Iterable[re.__Regex]
+    :rtype: re.__Regex | None
+    """
+    parts = []
+    for regex in regexes:
+        pattern = getattr(regex, "pattern", None)
+        if not isinstance(pattern, str) or _group_reference_re.search(pattern):
+            return None
+
+        # global flags are only allowed at the start of a pattern, and they're already included in regex.flags
+        pattern = _global_flags_re.sub("", pattern, count=1)
+        flags = "".join(char for flag, char in _inline_flags if regex.flags & flag)
+        if regex.flags & re.VERBOSE:
+            # make sure a trailing comment doesn't swallow the closing parenthesis
+            pattern += "\n"
+
+        parts.append("(?{}:{})".format(flags, pattern))
+
+    try:
+        return re.compile("|".join(parts))
+    except re.error:
+        return None
+
+
+class SortedHookList:
+    """
+    A list of hooks which is kept sorted by priority as hooks are added and removed.
+
+    Hooks with the same priority stay in the order they were added. Each hook can only be in the list once.
+
+    Iterating over the list goes through an immutable snapshot of the hooks, so hooks can be added or removed (e.g. by
+    a plugin reload) while the list is being iterated over.
+    """
+
+    def __init__(self, hooks=()):
+        """
+        :type hooks: collections.Iterable[Hook]
+        """
+        self._hooks = []
+        # (priority, insertion number) for each hook, kept in step with self._hooks so we can bisect on it
+        self._keys = []
+        # maps id(hook) to its key, so a hook can be found without scanning
+        self._hook_keys = {}
+        self._counter = count()
+        self._snapshot = ()
+        for hook in hooks:
+            self.append(hook)
+
+    def append(self, hook):
+        """
+        Inserts a hook after any other hooks with the same priority, raises ValueError if it's already in the list
+        :type hook: Hook
+        """
+        if id(hook) in self._hook_keys:
+            raise ValueError("{!r} is already in the list".format(hook))
+
+        key = (hook.priority, next(self._counter))
+        index = bisect_right(self._keys, key)
+        self._keys.insert(index, key)
+        self._hooks.insert(index, hook)
+        self._hook_keys[id(hook)] = key
+        self._snapshot = None
+
+    def remove(self, hook):
+        """
+        :type hook: Hook
+        """
+        key = self._hook_keys.pop(id(hook), None)
+        if key is None:
+            raise ValueError("{!r} is not in the list".format(hook))
+
+        index = bisect_left(self._keys, key)
+        del self._hooks[index]
+        del self._keys[index]
+        self._snapshot = None
+
+    @property
+    def snapshot(self):
+        """
+        :rtype: tuple[Hook]
+        """
+        if self._snapshot is None:
+            self._snapshot = tuple(self._hooks)
+
+        return self._snapshot
+
+    def __iter__(self):
+        return iter(self.snapshot)
+
+    def __len__(self):
+        return len(self._hooks)
+
+    def __contains__(self, hook):
+        return id(hook) in self._hook_keys
+
+    def __repr__(self):
+        return "{}({})".format(type(self).__name__, self._hooks)
+
+
 class PluginManager:
     """
     PluginManager is the core of CloudBot plugin loading.
@@ -74,13 +239,13 @@ class PluginManager:
     - SievePlugin is a catch-all sieve, which all other plugins go through before being executed.
 
     :type bot: cloudbot.bot.CloudBot
-    :type plugins: dict[str, Plugin]
+    :type plugins: dict[Path, Plugin]
     :type commands: dict[str, CommandHook]
-    :type raw_triggers: dict[str, list[RawHook]]
-    :type catch_all_triggers: list[RawHook]
-    :type event_type_hooks: dict[cloudbot.event.EventType, list[EventHook]]
-    :type regex_hooks: list[(re.__Regex, RegexHook)]
-    :type sieves: list[SieveHook]
+    :type raw_triggers: dict[str, SortedHookList[RawHook]]
+    :type catch_all_triggers: SortedHookList[RawHook]
+    :type event_type_hooks: dict[cloudbot.event.EventType, SortedHookList[EventHook]]
+    :type regex_hooks: SortedHookList[RegexHook]
+    :type sieves: SortedHookList[SieveHook]
     """
 
     def __init__(self, bot):
@@ -93,17 +258,43 @@ class PluginManager:
         self.plugins = {}
         self._plugin_name_map = WeakValueDictionary()
         self.commands = {}
-        self.raw_triggers = {}
-        self.catch_all_triggers = []
-        self.event_type_hooks = {}
-        self.regex_hooks = []
-        self.sieves = []
-        self.cap_hooks = {"on_available": defaultdict(list), "on_ack": defaultdict(list)}
-        self.connect_hooks = []
-        self.out_sieves = []
-        self.hook_hooks = defaultdict(list)
-        self.perm_hooks = defaultdict(list)
+        self.raw_triggers = defaultdict(SortedHookList)
+        self.catch_all_triggers = SortedHookList()
+        self.event_type_hooks = defaultdict(SortedHookList)
+        self.regex_hooks = SortedHookList()
+        self._regex_union = None
+        self._regex_union_stale = True
+        self.sieves = SortedHookList()
+        self.cap_hooks = {"on_available": defaultdict(SortedHookList), "on_ack": defaultdict(SortedHookList)}
+        self.connect_hooks = SortedHookList()
+        self.out_sieves = SortedHookList()
+        self.hook_hooks = defaultdict(SortedHookList)
+        self.perm_hooks = defaultdict(SortedHookList)
         self._hook_waiting_queues = {}
+        self._show_plugin_loading = True
+        self._update_logging_config()
+
+        # maps hook types to the method that registers hooks of that type
+        self._hook_registrars = {
+            "on_cap_available": self._register_cap_available_hook,
+            "on_cap_ack": self._register_cap_ack_hook,
+            "periodic": self._register_periodic_hook,
+            "command": self._register_command_hook,
+            "irc_raw": self._register_raw_hook,
+            "event": self._register_event_hook,
+            "regex": self._register_regex_hook,
+            "sieve": self._register_sieve_hook,
+            "on_connect": self._register_connect_hook,
+            "irc_out": self._register_out_hook,
+            "post_hook": self._register_post_hook,
+            "perm_check": self._register_perm_hook,
+        }
+
+    def _update_logging_config(self):
+        """
+        Caches the plugin loading log settings from the bot config, so we don't look them up for every hook
+        """
+        self._show_plugin_loading = bool(self.bot.config.get("logging", {}).get("show_plugin_loading", True))
 
     def find_plugin(self, title):
         """
@@ -113,8 +304,7 @@ class PluginManager:
         """
         return self._plugin_name_map.get(title)
 
-    @asyncio.coroutine
-    def load_all(self, plugin_dir):
+    async def load_all(self, plugin_dir):
         """
         Load a plugin from each *.py file in the given directory.
 
@@ -122,21 +312,24 @@ class PluginManager:
 
         :type plugin_dir: str
         """
-        plugin_dir = Path(plugin_dir)
+        self._update_logging_config()
+
+        # resolve the directory once, so the paths found in it are already resolved
+        plugin_dir = Path(plugin_dir).resolve()
         # Load all .py files in the plugins directory and any subdirectory
         # But ignore files starting with _
         path_list = plugin_dir.rglob("[!_]*.py")
-        # Load plugins asynchronously :O
-        yield from asyncio.gather(*[self.load_plugin(path) for path in path_list], loop=self.bot.loop)
+        # Import plugin modules on this thread, some plugins do things at import time which only work on the main
+        # thread (e.g. setting signal handlers)
+        modules = [self._import_plugin(path) for path in path_list]
 
-    @asyncio.coroutine
-    def unload_all(self):
-        yield from asyncio.gather(
-            *[self.unload_plugin(path) for path in self.plugins.keys()], loop=self.bot.loop
-        )
+        # Then register the hooks
+        await asyncio.gather(*[self._register_plugin(*module) for module in modules if module is not None])
 
-    @asyncio.coroutine
-    def load_plugin(self, path):
+    async def unload_all(self):
+        await asyncio.gather(*[self._unload_plugin(plugin) for plugin in self.plugins.values()])
+
+    async def load_plugin(self, path):
         """
         Loads a plugin from the given path and plugin object, then registers all hooks from that plugin.
 
@@ -147,7 +340,29 @@ class PluginManager:
 
         path = Path(path)
         file_path = path.resolve()
-        file_name = file_path.name
+
+        # make sure to unload the previously loaded plugin from this path, if it was loaded.
+        plugin = self.plugins.get(file_path)
+        if plugin is not None:
+            await self._unload_plugin(plugin)
+
+        module = self._import_plugin(file_path)
+        if module is None:
+            return
+
+        await self._register_plugin(*module)
+
+    def _import_plugin(self, file_path):
+        """
+        Imports (or reloads) the plugin module at the given, already resolved, path.
+
+        This runs the plugin's import-time code, so it has to be called from the main thread.
+
+        Returns a tuple of (file_path, title, module), or None if the plugin shouldn't or couldn't be loaded.
+
+        :type file_path: Path
+        :rtype: (Path, str, object) | None
+        """
         # Resolve the path relative to the current directory
         plugin_path = file_path.relative_to(self.bot.base_dir)
         title = '.'.join(plugin_path.parts[1:]).rsplit('.', 1)[0]
@@ -158,37 +373,45 @@ class PluginManager:
             if pl.get("use_whitelist", False):
                 if title not in pl.get("whitelist", []):
                     logger.info('Not loading plugin module "{}": plugin not whitelisted'.format(title))
-                    return
+                    return None
             else:
                 if title in pl.get("blacklist", []):
                     logger.info('Not loading plugin module "{}": plugin blacklisted'.format(title))
-                    return
-
-        # make sure to unload the previously loaded plugin from this path, if it was loaded.
-        if file_path in self.plugins:
-            yield from self.unload_plugin(file_path)
+                    return None
 
         module_name = "plugins.{}".format(title)
         try:
-            plugin_module = importlib.import_module(module_name)
+            plugin_module = _import_module(module_name)
             # if this plugin was loaded before, reload it
             if hasattr(plugin_module, "_cloudbot_loaded"):
+                # drop any hooks left over from a previous failed reload, they'll be registered again
+                plugin_module.__dict__.pop("_cloudbot_hooks", None)
                 importlib.reload(plugin_module)
         except Exception:
             logger.exception("Error loading {}:".format(title))
-            return
+            return None
+
+        return file_path, title, plugin_module
 
+    async def _register_plugin(self, file_path, title, plugin_module):
+        """
+        Creates a Plugin from an imported plugin module, then registers all hooks from that plugin.
+
+        :type file_path: Path
+        :type title: str
+        :type plugin_module: object
+        """
         # create the plugin
-        plugin = Plugin(str(file_path), file_name, title, plugin_module)
+        plugin = Plugin(file_path, file_path.name, title, plugin_module)
 
         # proceed to register hooks
 
         # create database tables
-        yield from plugin.create_tables(self.bot)
+        await plugin.create_tables(self.bot)
 
         # run on_start hooks
         for on_start_hook in plugin.hooks["on_start"]:
-            success = yield from self.launch(on_start_hook, Event(bot=self.bot, hook=on_start_hook))
+            success = await self.launch(on_start_hook, Event(bot=self.bot, hook=on_start_hook))
             if not success:
                 logger.warning("Not registering hooks from plugin {}: on_start hook errored".format(plugin.title))
 
@@ -199,101 +422,108 @@ class PluginManager:
         self.plugins[plugin.file_path] = plugin
         self._plugin_name_map[plugin.title] = plugin
 
-        for on_cap_available_hook in plugin.hooks["on_cap_available"]:
-            for cap in on_cap_available_hook.caps:
-                self.cap_hooks["on_available"][cap.casefold()].append(on_cap_available_hook)
-            self._log_hook(on_cap_available_hook)
-
-        for on_cap_ack_hook in plugin.hooks["on_cap_ack"]:
-            for cap in on_cap_ack_hook.caps:
-                self.cap_hooks["on_ack"][cap.casefold()].append(on_cap_ack_hook)
-            self._log_hook(on_cap_ack_hook)
+        for hook_type, hooks in plugin.hooks.items():
+            registrar = self._hook_registrars.get(hook_type)
+            if registrar is None:
+                # on_start and on_stop hooks are run directly, rather than registered
+                continue
 
-        for periodic_hook in plugin.hooks["periodic"]:
-            task = async_util.wrap_future(self._start_periodic(periodic_hook))
-            plugin.tasks.append(task)
-            self._log_hook(periodic_hook)
+            for hook in hooks:
+                registrar(hook)
+                self._log_hook(hook)
 
-        # register commands
-        for command_hook in plugin.hooks["command"]:
-            for alias in command_hook.aliases:
-                if alias in self.commands:
-                    logger.warning(
-                        "Plugin {} attempted to register command {} which was already registered by {}. "
-                        "Ignoring new assignment.".format(plugin.title, alias, self.commands[alias].plugin.title))
-                else:
-                    self.commands[alias] = command_hook
-            self._log_hook(command_hook)
-
-        # register raw hooks
-        for raw_hook in plugin.hooks["irc_raw"]:
-            if raw_hook.is_catch_all():
-                self.catch_all_triggers.append(raw_hook)
-            else:
-                for trigger in raw_hook.triggers:
-                    if trigger in self.raw_triggers:
-                        self.raw_triggers[trigger].append(raw_hook)
-                    else:
-                        self.raw_triggers[trigger] = [raw_hook]
-            self._log_hook(raw_hook)
+        # we don't need this anymore
+        del plugin.hooks["on_start"]
 
-        # register events
-        for event_hook in plugin.hooks["event"]:
-            for event_type in event_hook.types:
-                if event_type in self.event_type_hooks:
-                    self.event_type_hooks[event_type].append(event_hook)
-                else:
-                    self.event_type_hooks[event_type] = [event_hook]
-            self._log_hook(event_hook)
+    def _register_cap_available_hook(self, hook):
+        """
+        :type hook: OnCapAvaliableHook
+        """
+        for cap in hook.caps:
+            self.cap_hooks["on_available"][cap].append(hook)
 
-        # register regexps
-        for regex_hook in plugin.hooks["regex"]:
-            for regex_match in regex_hook.regexes:
-                self.regex_hooks.append((regex_match, regex_hook))
-            self._log_hook(regex_hook)
+    def _register_cap_ack_hook(self, hook):
+        """
+        :type hook: OnCapAckHook
+        """
+        for cap in hook.caps:
+            self.cap_hooks["on_ack"][cap].append(hook)
 
-        # register sieves
-        for sieve_hook in plugin.hooks["sieve"]:
-            self.sieves.append(sieve_hook)
-            self._log_hook(sieve_hook)
+    def _register_periodic_hook(self, hook):
+        """
+        :type hook: PeriodicHook
+        """
+        task = async_util.wrap_future(self._start_periodic(hook))
+        hook.plugin.tasks.append(task)
 
-        # register connect hooks
-        for connect_hook in plugin.hooks["on_connect"]:
-            self.connect_hooks.append(connect_hook)
-            self._log_hook(connect_hook)
+    def _register_command_hook(self, hook):
+        """
+        :type hook: CommandHook
+        """
+        for alias in hook.aliases:
+            if alias in self.commands:
+                logger.warning(
+                    "Plugin {} attempted to register command {} which was already registered by {}. "
+                    "Ignoring new assignment.".format(hook.plugin.title, alias, self.commands[alias].plugin.title))
+            else:
+                self.commands[alias] = hook
 
-        for out_hook in plugin.hooks["irc_out"]:
-            self.out_sieves.append(out_hook)
-            self._log_hook(out_hook)
+    def _register_raw_hook(self, hook):
+        """
+        :type hook: RawHook
+        """
+        if hook.is_catch_all():
+            self.catch_all_triggers.append(hook)
+        else:
+            for trigger in hook.triggers:
+                self.raw_triggers[trigger].append(hook)
 
-        for post_hook in plugin.hooks["post_hook"]:
-            self.hook_hooks["post"].append(post_hook)
-            self._log_hook(post_hook)
+    def _register_event_hook(self, hook):
+        """
+        :type hook: EventHook
+        """
+        for event_type in hook.types:
+            self.event_type_hooks[event_type].append(hook)
 
-        for perm_hook in plugin.hooks["perm_check"]:
-            for perm in perm_hook.perms:
-                self.perm_hooks[perm].append(perm_hook)
+    def _register_regex_hook(self, hook):
+        """
+        :type hook: RegexHook
+        """
+        self.regex_hooks.append(hook)
+        self._regex_union_stale = True
 
-            self._log_hook(perm_hook)
+    def _register_sieve_hook(self, hook):
+        """
+        :type hook: SieveHook
+        """
+        self.sieves.append(hook)
 
-        # sort sieve hooks by priority
-        self.sieves.sort(key=lambda x: x.priority)
-        self.connect_hooks.sort(key=attrgetter("priority"))
+    def _register_connect_hook(self, hook):
+        """
+        :type hook: OnConnectHook
+        """
+        self.connect_hooks.append(hook)
 
-        # Sort hooks
-        self.regex_hooks.sort(key=lambda x: x[1].priority)
-        dicts_of_lists_of_hooks = (self.event_type_hooks, self.raw_triggers, self.perm_hooks, self.hook_hooks)
-        lists_of_hooks = [self.catch_all_triggers, self.sieves, self.connect_hooks, self.out_sieves]
-        lists_of_hooks.extend(chain.from_iterable(d.values() for d in dicts_of_lists_of_hooks))
+    def _register_out_hook(self, hook):
+        """
+        :type hook: IrcOutHook
+        """
+        self.out_sieves.append(hook)
 
-        for lst in lists_of_hooks:
-            lst.sort(key=attrgetter("priority"))
+    def _register_post_hook(self, hook):
+        """
+        :type hook: PostHookHook
+        """
+        self.hook_hooks["post"].append(hook)
 
-        # we don't need this anymore
-        del plugin.hooks["on_start"]
+    def _register_perm_hook(self, hook):
+        """
+        :type hook: PermHook
+        """
+        for perm in hook.perms:
+            self.perm_hooks[perm].append(hook)
 
-    @asyncio.coroutine
-    def unload_plugin(self, path):
+    async def unload_plugin(self, path):
         """
         Unloads the plugin from the given path, unregistering all hooks from the plugin.
 
@@ -305,36 +535,41 @@ class PluginManager:
         path = Path(path)
         file_path = path.resolve()
 
-        # make sure this plugin is actually loaded
-        if str(file_path) not in self.plugins:
+        # get the loaded plugin, making sure this plugin is actually loaded
+        plugin = self.plugins.get(file_path)
+        if plugin is None:
             return False
 
-        # get the loaded plugin
-        plugin = self.plugins[str(file_path)]
+        await self._unload_plugin(plugin)
+        return True
 
+    async def _unload_plugin(self, plugin):
+        """
+        Unregisters all hooks from a loaded plugin.
+
+        :type plugin: Plugin
+        """
         for task in plugin.tasks:
             task.cancel()
 
         for on_cap_available_hook in plugin.hooks["on_cap_available"]:
             available_hooks = self.cap_hooks["on_available"]
             for cap in on_cap_available_hook.caps:
-                cap_cf = cap.casefold()
-                available_hooks[cap_cf].remove(on_cap_available_hook)
-                if not available_hooks[cap_cf]:
-                    del available_hooks[cap_cf]
+                available_hooks[cap].remove(on_cap_available_hook)
+                if not available_hooks[cap]:
+                    del available_hooks[cap]
 
         for on_cap_ack in plugin.hooks["on_cap_ack"]:
             ack_hooks = self.cap_hooks["on_ack"]
             for cap in on_cap_ack.caps:
-                cap_cf = cap.casefold()
-                ack_hooks[cap_cf].remove(on_cap_ack)
-                if not ack_hooks[cap_cf]:
-                    del ack_hooks[cap_cf]
+                ack_hooks[cap].remove(on_cap_ack)
+                if not ack_hooks[cap]:
+                    del ack_hooks[cap]
 
         # unregister commands
         for command_hook in plugin.hooks["command"]:
             for alias in command_hook.aliases:
-                if alias in self.commands and self.commands[alias] == command_hook:
+                if self.commands.get(alias) is command_hook:
                     # we need to make sure that there wasn't a conflict, so we don't delete another plugin's command
                     del self.commands[alias]
 
@@ -359,8 +594,8 @@ class PluginManager:
 
         # unregister regexps
         for regex_hook in plugin.hooks["regex"]:
-            for regex_match in regex_hook.regexes:
-                self.regex_hooks.remove((regex_match, regex_hook))
+            self.regex_hooks.remove(regex_hook)
+            self._regex_union_stale = True
 
         # unregister sieves
         for sieve_hook in plugin.hooks["sieve"]:
@@ -383,7 +618,7 @@ class PluginManager:
         # Run on_stop hooks
         for on_stop_hook in plugin.hooks["on_stop"]:
             event = Event(bot=self.bot, hook=on_stop_hook)
-            yield from self.launch(on_stop_hook, event)
+            await self.launch(on_stop_hook, event)
 
         # unregister databases
         plugin.unregister_tables(self.bot)
@@ -391,10 +626,35 @@ class PluginManager:
         # remove last reference to plugin
         del self.plugins[plugin.file_path]
 
-        if self.bot.config.get("logging", {}).get("show_plugin_loading", True):
+        if self._show_plugin_loading:
             logger.info("Unloaded all plugins from {}".format(plugin.title))
 
-        return True
+    def regex_could_match(self, text):
+        """
+        Checks whether any registered regex hook could match the given text, using a single search over all of the
+        registered regexes combined.
+
+        This only tells us whether it's worth checking each regex hook individually, every hook still needs to
+        run its own regex to get its match object.
+
+        :type text: str
+        :rtype: bool
+        """
+        if not self.regex_hooks:
+            # an empty combined pattern would match everything
+            return False
+
+        if self._regex_union_stale:
+            self._regex_union = _compile_regex_union(
+                regex for regex_hook in self.regex_hooks for regex in regex_hook.regexes
+            )
+            self._regex_union_stale = False
+
+        if self._regex_union is None:
+            # the regexes couldn't be combined, so we have to check them one by one
+            return True
+
+        return self._regex_union.search(text) is not None
 
     def _log_hook(self, hook):
         """
@@ -402,7 +662,7 @@ class PluginManager:
 
         :type hook: Hook
         """
-        if self.bot.config.get("logging", {}).get("show_plugin_loading", True):
+        if self._show_plugin_loading:
             logger.info("Loaded {}".format(hook))
             logger.debug("Loaded {}".format(repr(hook)))
 
@@ -416,14 +676,14 @@ class PluginManager:
         """
         parameters = []
         for required_arg in hook.required_args:
-            if hasattr(event, required_arg):
-                value = getattr(event, required_arg)
-                parameters.append(value)
-            else:
+            value = getattr(event, required_arg, _missing)
+            if value is _missing:
                 logger.error("Plugin {} asked for invalid argument '{}', cancelling execution!"
                              .format(hook.description, required_arg))
                 logger.debug("Valid arguments are: {} ({})".format(dir(event), event))
                 return None
+
+            parameters.append(value)
         return parameters
 
     def _execute_hook_threaded(self, hook, event):
@@ -442,25 +702,23 @@ class PluginManager:
         finally:
             event.close_threaded()
 
-    @asyncio.coroutine
-    def _execute_hook_sync(self, hook, event):
+    async def _execute_hook_sync(self, hook, event):
         """
         :type hook: Hook
         :type event: cloudbot.event.Event
         """
-        yield from event.prepare()
+        await event.prepare()
 
         parameters = self._prepare_parameters(hook, event)
         if parameters is None:
             return None
 
         try:
-            return (yield from hook.function(*parameters))
+            return await hook.function(*parameters)
         finally:
-            yield from event.close()
+            await event.close()
 
-    @asyncio.coroutine
-    def internal_launch(self, hook, event):
+    async def internal_launch(self, hook, event):
         """
         Launches a hook with the data from [event]
         :param hook: The hook to launch
@@ -469,17 +727,16 @@ class PluginManager:
         """
         try:
             if hook.threaded:
-                out = yield from self.bot.loop.run_in_executor(None, self._execute_hook_threaded, hook, event)
+                out = await self.bot.loop.run_in_executor(None, self._execute_hook_threaded, hook, event)
             else:
-                out = yield from self._execute_hook_sync(hook, event)
+                out = await self._execute_hook_sync(hook, event)
         except Exception as e:
             logger.exception("Error in hook {}".format(hook.description))
             return False, e
 
         return True, out
 
-    @asyncio.coroutine
-    def _execute_hook(self, hook, event):
+    async def _execute_hook(self, hook, event):
         """
         Runs the specific hook with the given bot and event.
 
@@ -489,26 +746,31 @@ class PluginManager:
         :type event: cloudbot.event.Event
         :rtype: bool
         """
-        ok, out = yield from self.internal_launch(hook, event)
+        ok, out = await self.internal_launch(hook, event)
+
+        # use .get() so we don't create an empty list in the defaultdict
+        post_hooks = self.hook_hooks.get("post")
+        if not post_hooks:
+            return ok
+
         result, error = None, None
         if ok is True:
             result = out
         else:
             error = out
 
-        post_event = partial(
-            PostHookEvent, launched_hook=hook, launched_event=event, bot=event.bot,
-            conn=event.conn, result=result, error=error
-        )
-        for post_hook in self.hook_hooks["post"]:
-            success, res = yield from self.internal_launch(post_hook, post_event(hook=post_hook))
+        for post_hook in post_hooks:
+            post_event = PostHookEvent(
+                launched_hook=hook, launched_event=event, bot=event.bot, conn=event.conn,
+                result=result, error=error, hook=post_hook
+            )
+            success, res = await self.internal_launch(post_hook, post_event)
             if success and res is False:
                 break
 
         return ok
 
-    @asyncio.coroutine
-    def _sieve(self, sieve, event, hook):
+    async def _sieve(self, sieve, event, hook):
         """
         :type sieve: cloudbot.plugin.Hook
         :type event: cloudbot.event.Event
@@ -517,28 +779,26 @@ class PluginManager:
         """
         try:
             if sieve.threaded:
-                result = yield from self.bot.loop.run_in_executor(None, sieve.function, self.bot, event, hook)
+                result = await self.bot.loop.run_in_executor(None, sieve.function, self.bot, event, hook)
             else:
-                result = yield from sieve.function(self.bot, event, hook)
+                result = await sieve.function(self.bot, event, hook)
         except Exception:
             logger.exception("Error running sieve {} on {}:".format(sieve.description, hook.description))
             return None
         else:
             return result
 
-    @asyncio.coroutine
-    def _start_periodic(self, hook):
+    async def _start_periodic(self, hook):
         interval = hook.interval
         initial_interval = hook.initial_interval
-        yield from asyncio.sleep(initial_interval)
+        await asyncio.sleep(initial_interval)
 
         while True:
             event = Event(bot=self.bot, hook=hook)
-            yield from self.launch(hook, event)
-            yield from asyncio.sleep(interval)
+            await self.launch(hook, event)
+            await asyncio.sleep(interval)
 
-    @asyncio.coroutine
-    def launch(self, hook, event):
+    async def launch(self, hook, event):
         """
         Dispatch a given event to a given hook using a given bot object.
 
@@ -549,9 +809,10 @@ class PluginManager:
         :rtype: bool
         """
 
-        if hook.type not in ("on_start", "on_stop", "periodic"):  # we don't need sieves on on_start hooks.
-            for sieve in self.bot.plugin_manager.sieves:
-                event = yield from self._sieve(sieve, event, hook)
+        sieves = self.sieves.snapshot
+        if sieves and hook.type not in _unsieved_hook_types:
+            for sieve in sieves:
+                event = await self._sieve(sieve, event, hook)
                 if event is None:
                     return False
 
@@ -571,14 +832,14 @@ class PluginManager:
                 future = asyncio.Future()
                 queue.put_nowait(future)
                 # wait until the last task is completed
-                yield from future
+                await future
             else:
                 # set to None to signify that this hook is running, but there's no need to create a full queue
                 # in case there are no more hooks that will wait
                 self._hook_waiting_queues[key] = None
 
             # Run the plugin with the message, and wait for it to finish
-            result = yield from self._execute_hook(hook, event)
+            result = await self._execute_hook(hook, event)
 
             queue = self._hook_waiting_queues[key]
             if queue is None or queue.empty():
@@ -586,11 +847,11 @@ class PluginManager:
                 del self._hook_waiting_queues[key]
             else:
                 # set the result for the next task's future, so they can execute
-                next_future = yield from queue.get()
+                next_future = await queue.get()
                 next_future.set_result(None)
         else:
             # Run the plugin with the message, and wait for it to finish
-            result = yield from self._execute_hook(hook, event)
+            result = await self._execute_hook(hook, event)
 
         # Return the result
         return result
@@ -600,7 +861,7 @@ class Plugin:
     """
     Each Plugin represents a plugin file, and contains loaded hooks.
 
-    :type file_path: str
+    :type file_path: Path
     :type file_name: str
     :type title: str
     :type hooks: dict
@@ -609,7 +870,7 @@ class Plugin:
 
     def __init__(self, filepath, filename, title, code):
         """
-        :type filepath: str
+        :type filepath: Path
         :type filename: str
         :type code: object
         """
@@ -624,8 +885,7 @@ class Plugin:
         # Keep a reference to this in case another plugin needs to access it
         self.code = code
 
-    @asyncio.coroutine
-    def create_tables(self, bot):
+    async def create_tables(self, bot):
         """
         Creates all sqlalchemy Tables that are registered in this plugin
 
@@ -637,8 +897,8 @@ class Plugin:
             logger.info("Registering tables for {}".format(self.title))
 
             for table in self.tables:
-                if not (yield from bot.loop.run_in_executor(None, table.exists, bot.db_engine)):
-                    yield from bot.loop.run_in_executor(None, table.create, bot.db_engine)
+                if not await bot.loop.run_in_executor(None, table.exists, bot.db_engine):
+                    await bot.loop.run_in_executor(None, table.create, bot.db_engine)
 
     def unregister_tables(self, bot):
         """
@@ -661,12 +921,17 @@ class Hook:
     :type plugin: Plugin
     :type function: callable
     :type function_name: str
-    :type required_args: list[str]
+    :type required_args: tuple[str]
     :type threaded: bool
-    :type permissions: list[str]
+    :type permissions: list[str] | tuple[str]
     :type single_thread: bool
     """
 
+    __slots__ = (
+        "type", "plugin", "function", "function_name", "required_args", "threaded", "permissions", "single_thread",
+        "action", "priority",
+    )
+
     def __init__(self, _type, plugin, func_hook):
         """
         :type _type: str
@@ -678,10 +943,7 @@ class Hook:
         self.function = func_hook.function
         self.function_name = self.function.__name__
 
-        sig = inspect.signature(self.function)
-
-        # don't process args starting with "_"
-        self.required_args = [arg for arg in sig.parameters.keys() if not arg.startswith('_')]
+        self.required_args = _get_required_args(self.function)
         if sys.version_info < (3, 7, 0):
             if "async" in self.required_args:
                 logger.warning("Use of deprecated function 'async' in %s", self.description)
@@ -691,19 +953,21 @@ class Hook:
                     DeprecationWarning, stacklevel=2
                 )
 
-        if asyncio.iscoroutine(self.function) or asyncio.iscoroutinefunction(self.function):
-            self.threaded = False
+        # hooks are always functions, never coroutine objects, so there's no need to check asyncio.iscoroutine()
+        self.threaded = not asyncio.iscoroutinefunction(self.function)
+
+        kwargs = func_hook.kwargs
+        if kwargs:
+            options = [kwargs.pop(name, default) for name, default in _hook_options]
         else:
-            self.threaded = True
+            # most hooks don't pass any options, so there's nothing to pop
+            options = _hook_option_defaults
 
-        self.permissions = func_hook.kwargs.pop("permissions", [])
-        self.single_thread = func_hook.kwargs.pop("singlethread", False)
-        self.action = func_hook.kwargs.pop("action", Action.CONTINUE)
-        self.priority = func_hook.kwargs.pop("priority", Priority.NORMAL)
+        self.permissions, self.single_thread, self.action, self.priority = options
 
-        if func_hook.kwargs:
+        if kwargs:
             # we should have popped all the args, so warn if there are any left
-            logger.warning("Ignoring extra args {} from {}".format(func_hook.kwargs, self.description))
+            logger.warning("Ignoring extra args {} from {}".format(kwargs, self.description))
 
     @property
     def description(self):
@@ -715,6 +979,49 @@ class Hook:
         )
 
 
+class _SimpleHook(Hook):
+    """
+    Base class for hooks which don't carry anything beyond what Hook does. Subclasses are created with _simple_hook().
+
+    :type _type: str
+    :type _repr_name: str
+    :type _str_name: str
+    """
+
+    __slots__ = ()
+
+    _type = None
+    _repr_name = None
+    _str_name = None
+
+    def __init__(self, plugin, func_hook):
+        """
+        :type plugin: Plugin
+        :type func_hook: cloudbot.hook._Hook
+        """
+        super().__init__(self._type, plugin, func_hook)
+
+    def __repr__(self):
+        return "{}[{}]".format(self._repr_name, Hook.__repr__(self))
+
+    def __str__(self):
+        return "{} {} from {}".format(self._str_name, self.function_name, self.plugin.file_name)
+
+
+def _simple_hook(name, _type, repr_name, str_name):
+    """
+    Creates a Hook class for a hook type which has no extra data
+    :type name: str
+    :type _type: str
+    :type repr_name: str
+    :type str_name: str
+    :rtype: type
+    """
+    return type(name, (_SimpleHook,), {
+        "__slots__": (), "__module__": __name__, "_type": _type, "_repr_name": repr_name, "_str_name": str_name,
+    })
+
+
 class CommandHook(Hook):
     """
     :type name: str
@@ -723,6 +1030,8 @@ class CommandHook(Hook):
     :type auto_help: bool
     """
 
+    __slots__ = ("auto_help", "name", "aliases", "doc")
+
     def __init__(self, plugin, cmd_hook):
         """
         :type plugin: Plugin
@@ -750,6 +1059,8 @@ class RegexHook(Hook):
     :type regexes: set[re.__Regex]
     """
 
+    __slots__ = ("run_on_cmd", "only_no_match", "regexes")
+
     def __init__(self, plugin, regex_hook):
         """
         :type plugin: Plugin
@@ -775,6 +1086,8 @@ class PeriodicHook(Hook):
     :type interval: int
     """
 
+    __slots__ = ("interval", "initial_interval")
+
     def __init__(self, plugin, periodic_hook):
         """
         :type plugin: Plugin
@@ -798,6 +1111,8 @@ class RawHook(Hook):
     :type triggers: set[str]
     """
 
+    __slots__ = ("triggers",)
+
     def __init__(self, plugin, irc_raw_hook):
         """
         :type plugin: Plugin
@@ -817,19 +1132,7 @@ class RawHook(Hook):
         return "irc raw {} ({}) from {}".format(self.function_name, ",".join(self.triggers), self.plugin.file_name)
 
 
-class SieveHook(Hook):
-    def __init__(self, plugin, sieve_hook):
-        """
-        :type plugin: Plugin
-        :type sieve_hook: cloudbot.util.hook._SieveHook
-        """
-        super().__init__("sieve", plugin, sieve_hook)
-
-    def __repr__(self):
-        return "Sieve[{}]".format(Hook.__repr__(self))
-
-    def __str__(self):
-        return "sieve {} from {}".format(self.function_name, self.plugin.file_name)
+SieveHook = _simple_hook("SieveHook", "sieve", "Sieve", "sieve")
 
 
 class EventHook(Hook):
@@ -837,6 +1140,8 @@ class EventHook(Hook):
     :type types: set[cloudbot.event.EventType]
     """
 
+    __slots__ = ("types",)
+
     def __init__(self, plugin, event_hook):
         """
         :type plugin: Plugin
@@ -854,92 +1159,47 @@ class EventHook(Hook):
                                               self.plugin.file_name)
 
 
-class OnStartHook(Hook):
-    def __init__(self, plugin, on_start_hook):
-        """
-        :type plugin: Plugin
-        :type on_start_hook: cloudbot.util.hook._On_startHook
-        """
-        super().__init__("on_start", plugin, on_start_hook)
-
-    def __repr__(self):
-        return "On_start[{}]".format(Hook.__repr__(self))
-
-    def __str__(self):
-        return "on_start {} from {}".format(self.function_name, self.plugin.file_name)
-
-
-class OnStopHook(Hook):
-    def __init__(self, plugin, on_stop_hook):
-        super().__init__("on_stop", plugin, on_stop_hook)
-
-    def __repr__(self):
-        return "On_stop[{}]".format(Hook.__repr__(self))
-
-    def __str__(self):
-        return "on_stop {} from {}".format(self.function_name, self.plugin.file_name)
+OnStartHook = _simple_hook("OnStartHook", "on_start", "On_start", "on_start")
+OnStopHook = _simple_hook("OnStopHook", "on_stop", "On_stop", "on_stop")
 
 
 class CapHook(Hook):
+    __slots__ = ("caps",)
+
     def __init__(self, _type, plugin, base_hook):
-        self.caps = base_hook.caps
+        # casefolded here, so caps which only differ by case register the hook once
+        self.caps = {cap.casefold() for cap in base_hook.caps}
         super().__init__("on_cap_{}".format(_type), plugin, base_hook)
 
     def __repr__(self):
-        return "{name}[{caps} {base!r}]".format(name=self.type, caps=self.caps, base=super())
+        return "{name}[{caps} {base}]".format(name=self.type, caps=self.caps, base=Hook.__repr__(self))
 
     def __str__(self):
         return "{name} {func} from {file}".format(name=self.type, func=self.function_name, file=self.plugin.file_name)
 
 
 class OnCapAvaliableHook(CapHook):
+    __slots__ = ()
+
     def __init__(self, plugin, base_hook):
         super().__init__("available", plugin, base_hook)
 
 
 class OnCapAckHook(CapHook):
+    __slots__ = ()
+
     def __init__(self, plugin, base_hook):
         super().__init__("ack", plugin, base_hook)
 
 
-class OnConnectHook(Hook):
-    def __init__(self, plugin, sieve_hook):
-        """
-        :type plugin: Plugin
-        :type sieve_hook: cloudbot.util.hook._Hook
-        """
-        super().__init__("on_connect", plugin, sieve_hook)
-
-    def __repr__(self):
-        return "{name}[{base!r}]".format(name=self.type, base=super())
-
-    def __str__(self):
-        return "{name} {func} from {file}".format(name=self.type, func=self.function_name, file=self.plugin.file_name)
-
-
-class IrcOutHook(Hook):
-    def __init__(self, plugin, out_hook):
-        super().__init__("irc_out", plugin, out_hook)
-
-    def __repr__(self):
-        return "Irc_Out[{}]".format(Hook.__repr__(self))
-
-    def __str__(self):
-        return "irc_out {} from {}".format(self.function_name, self.plugin.file_name)
-
-
-class PostHookHook(Hook):
-    def __init__(self, plugin, out_hook):
-        super().__init__("post_hook", plugin, out_hook)
-
-    def __repr__(self):
-        return "Post_hook[{}]".format(Hook.__repr__(self))
-
-    def __str__(self):
-        return "post_hook {} from {}".format(self.function_name, self.plugin.file_name)
+OnConnectHook = _simple_hook("OnConnectHook", "on_connect", "on_connect", "on_connect")
+IrcOutHook = _simple_hook("IrcOutHook", "irc_out", "Irc_Out", "irc_out")
+PostHookHook = _simple_hook("PostHookHook", "post_hook", "Post_hook", "post_hook")
 
 
 class PermHook(Hook):
+    __slots__ = ("perms",)
+
     def __init__(self, plugin, perm_hook):
         self.perms = perm_hook.perms
         super().__init__("perm_check", plugin, perm_hook)
@@ -951,19 +1211,22 @@ class PermHook(Hook):
         return "perm hook {} from {}".format(self.function_name, self.plugin.file_name)
 
 
-_hook_name_to_plugin = {
-    "command": CommandHook,
-    "regex": RegexHook,
-    "irc_raw": RawHook,
-    "sieve": SieveHook,
-    "event": EventHook,
-    "periodic": PeriodicHook,
-    "on_start": OnStartHook,
-    "on_stop": OnStopHook,
-    "on_cap_available": OnCapAvaliableHook,
-    "on_cap_ack": OnCapAckHook,
-    "on_connect": OnConnectHook,
-    "irc_out": IrcOutHook,
-    "post_hook": PostHookHook,
-    "perm_check": PermHook,
-}
+# indexed by cloudbot.hook.HookKind
+_hook_classes = (
+    CommandHook,
+    RegexHook,
+    RawHook,
+    SieveHook,
+    EventHook,
+    PeriodicHook,
+    OnStartHook,
+    OnStopHook,
+    OnCapAvaliableHook,
+    OnCapAckHook,
+    OnConnectHook,
+    IrcOutHook,
+    PostHookHook,
+    PermHook,
+)
+
+_hook_name_to_plugin = {kind.name.lower(): _hook_classes[kind] for kind in HookKind}
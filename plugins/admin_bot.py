@@ -6,16 +6,46 @@ from cloudbot.util import formatting
 
 logchannel = ""
 
-@asyncio.coroutine
+user_mask_re = re.compile(r".+!.+@.+")
+
+
+def _parse_args(text, min_args, max_args, notice, rest=False):
+    """
+    Splits text into min_args to max_args arguments, or notices the caller and returns None if it can't.
+    If rest is True, the last argument takes the rest of the text instead of there being too many arguments.
+    :type text: str
+    :type min_args: int
+    :type max_args: int
+    :type rest: bool
+    :rtype: list[str] | None
+    """
+    split = text.split(None, max_args - 1 if rest else max_args)
+    if len(split) > max_args:
+        notice("Too many arguments")
+        return None
+    elif len(split) < min_args:
+        notice("Not enough arguments")
+        return None
+    return split
+
+
+def _chanify(target):
+    """
+    Adds the '#' channel prefix to target if it doesn't already have it
+    :type target: str
+    :rtype: str
+    """
+    return target if target[:1] == "#" else "#" + target
+
+
 @hook.command("groups", "listgroups", "permgroups", permissions=["permissions_users"], autohelp=False)
 def get_permission_groups(conn):
     """- lists all valid groups
     :type conn: cloudbot.client.Client
     """
-    return "Valid groups: {}".format(conn.permissions.get_groups())
+    return f"Valid groups: {conn.permissions.get_groups()}"
 
 
-@asyncio.coroutine
 @hook.command("gperms", permissions=["permissions_users"])
 def get_group_permissions(text, conn, notice):
     """<group> - lists permissions given to <group>
@@ -24,17 +54,16 @@ def get_group_permissions(text, conn, notice):
     """
     group = text.strip()
     permission_manager = conn.permissions
-    group_users = permission_manager.get_group_users(group.lower())
-    group_permissions = permission_manager.get_group_permissions(group.lower())
+    group_users = permission_manager.get_group_users(group)
+    group_permissions = permission_manager.get_group_permissions(group)
     if group_permissions:
-        return "Group {} has permissions {}".format(group, group_permissions)
+        return f"Group {group} has permissions {group_permissions}"
     elif group_users:
-        return "Group {} exists, but has no permissions".format(group)
+        return f"Group {group} exists, but has no permissions"
     else:
-        notice("Unknown group '{}'".format(group))
+        notice(f"Unknown group '{group}'")
 
 
-@asyncio.coroutine
 @hook.command("gusers", permissions=["permissions_users"])
 def get_group_users(text, conn, notice):
     """<group> - lists users in <group>
@@ -43,17 +72,16 @@ def get_group_users(text, conn, notice):
     """
     group = text.strip()
     permission_manager = conn.permissions
-    group_users = permission_manager.get_group_users(group.lower())
-    group_permissions = permission_manager.get_group_permissions(group.lower())
+    group_users = permission_manager.get_group_users(group)
+    group_permissions = permission_manager.get_group_permissions(group)
     if group_users:
-        return "Group {} has members: {}".format(group, group_users)
+        return f"Group {group} has members: {group_users}"
     elif group_permissions:
-        return "Group {} exists, but has no members".format(group, group_permissions)
+        return f"Group {group} exists, but has no members"
     else:
-        notice("Unknown group '{}'".format(group))
+        notice(f"Unknown group '{group}'")
 
 
-@asyncio.coroutine
 @hook.command("uperms", autohelp=False)
 def get_user_permissions(text, conn, mask, has_permission, notice):
     """[user] - lists all permissions given to [user], or the caller if no user is specified
@@ -71,14 +99,13 @@ def get_user_permissions(text, conn, mask, has_permission, notice):
 
     permission_manager = conn.permissions
 
-    user_permissions = permission_manager.get_user_permissions(user.lower())
+    user_permissions = permission_manager.get_user_permissions(user)
     if user_permissions:
-        return "User {} has permissions: {}".format(user, user_permissions)
+        return f"User {user} has permissions: {user_permissions}"
     else:
-        return "User {} has no elevated permissions".format(user)
+        return f"User {user} has no elevated permissions"
 
 
-@asyncio.coroutine
 @hook.command("ugroups", autohelp=False)
 def get_user_groups(text, conn, mask, has_permission, notice):
     """[user] - lists all permissions given to [user], or the caller if no user is specified
@@ -96,97 +123,85 @@ def get_user_groups(text, conn, mask, has_permission, notice):
 
     permission_manager = conn.permissions
 
-    user_groups = permission_manager.get_user_groups(user.lower())
+    user_groups = permission_manager.get_user_groups(user)
     if user_groups:
-        return "User {} is in groups: {}".format(user, user_groups)
+        return f"User {user} is in groups: {user_groups}"
     else:
-        return "User {} is in no permission groups".format(user)
+        return f"User {user} is in no permission groups"
 
 
-@asyncio.coroutine
 @hook.command("deluser", permissions=["permissions_users"])
-def remove_permission_user(text, nick, bot, message, conn, notice, reply):
+def remove_permission_user(text, nick, message, conn, notice, reply):
     """<user> [group] - removes <user> from [group], or from all groups if no group is specified
     :type text: str
-    :type bot: cloudbot.bot.CloudBot
     :type conn: cloudbot.client.Client
     """
-    split = text.split()
-    if len(split) > 2:
-        notice("Too many arguments")
-        return
-    elif len(split) < 1:
-        notice("Not enough arguments")
+    split = _parse_args(text, 1, 2, notice)
+    if split is None:
         return
 
-    if len(split) > 1:
-        user = split[0]
-        group = split[1]
-    else:
-        user = split[0]
-        group = None
+    user = split[0]
+    group = split[1] if len(split) > 1 else None
 
     permission_manager = conn.permissions
     changed = False
     if group is not None:
-        if not permission_manager.group_exists(group.lower()):
-            notice("Unknown group '{}'".format(group))
+        if not permission_manager.group_exists(group):
+            notice(f"Unknown group '{group}'")
             return
-        changed_masks = permission_manager.remove_group_user(group.lower(), user.lower())
+        changed_masks = permission_manager.remove_group_user(group, user)
         if changed_masks:
             changed = True
         if len(changed_masks) > 1:
-            reply("Removed {} and {} from {}".format(", ".join(changed_masks[:-1]), changed_masks[-1], group))
+            head = ", ".join(changed_masks[:-1])
+            reply(f"Removed {head} and {changed_masks[-1]} from {group}")
             if logchannel:
-                message("{} used deluser remove {} and {} from {}.".format(nick, ", ".join(changed_masks[:-1]), changed_masks[-1], group), logchannel)
+                message(f"{nick} used deluser remove {head} and {changed_masks[-1]} from {group}.", logchannel)
         elif changed_masks:
-            reply("Removed {} from {}".format(changed_masks[0], group))
+            reply(f"Removed {changed_masks[0]} from {group}")
             if logchannel:
-                message("{} used deluser remove {} from {}.".format(nick, ", ".join(changed_masks[0]), group), logchannel)
+                message(f"{nick} used deluser remove {changed_masks[0]} from {group}.", logchannel)
         else:
-            reply("No masks in {} matched {}".format(group, user))
+            reply(f"No masks in {group} matched {user}")
     else:
-        groups = permission_manager.get_user_groups(user.lower())
+        groups = permission_manager.get_user_groups(user)
+        if not groups:
+            reply(f"No masks with elevated permissions matched {user}")
+            return
+
         for group in groups:
-            changed_masks = permission_manager.remove_group_user(group.lower(), user.lower())
+            changed_masks = permission_manager.remove_group_user(group, user)
             if changed_masks:
                 changed = True
             if len(changed_masks) > 1:
-                reply("Removed {} and {} from {}".format(", ".join(changed_masks[:-1]), changed_masks[-1], group))
+                head = ", ".join(changed_masks[:-1])
+                reply(f"Removed {head} and {changed_masks[-1]} from {group}")
                 if logchannel:
-                    message("{} used deluser remove {} and {} from {}.".format(nick, ", ".join(changed_masks[:-1]), changed_masks[-1], group), logchannel)
+                    message(f"{nick} used deluser remove {head} and {changed_masks[-1]} from {group}.", logchannel)
             elif changed_masks:
-                reply("Removed {} from {}".format(changed_masks[0], group))
+                reply(f"Removed {changed_masks[0]} from {group}")
                 if logchannel:
-                    message("{} used deluser remove {} from {}.".format(nick, ", ".join(changed_masks[0]), group), logchannel)
+                    message(f"{nick} used deluser remove {changed_masks[0]} from {group}.", logchannel)
         if not changed:
-            reply("No masks with elevated permissions matched {}".format(group, user))
+            reply(f"No masks with elevated permissions matched {user}")
 
     if changed:
-        bot.config.save_config()
-        permission_manager.reload()
+        permission_manager.mark_dirty()
 
 
-@asyncio.coroutine
 @hook.command("adduser", permissions=["permissions_users"])
-def add_permissions_user(text, nick, message, conn, bot, notice, reply):
+def add_permissions_user(text, nick, message, conn, notice, reply):
     """<user> <group> - adds <user> to <group>
     :type text: str
     :type conn: cloudbot.client.Client
-    :type bot: cloudbot.bot.CloudBot
     """
-    split = text.split()
-    if len(split) > 2:
-        notice("Too many arguments")
-        return
-    elif len(split) < 2:
-        notice("Not enough arguments")
+    split = _parse_args(text, 2, 2, notice)
+    if split is None:
         return
 
-    user = split[0]
-    group = split[1]
+    user, group = split
 
-    if not re.search('.+!.+@.+', user):
+    if not user_mask_re.match(user):
         # TODO: When we have presence tracking, check if there are any users in the channel with the nick given
         notice("The user must be in the format 'nick!user@host'")
         return
@@ -195,22 +210,21 @@ def add_permissions_user(text, nick, message, conn, bot, notice, reply):
 
     group_exists = permission_manager.group_exists(group)
 
-    changed = permission_manager.add_user_to_group(user.lower(), group.lower())
+    changed = permission_manager.add_user_to_group(user, group)
 
     if not changed:
-        reply("User {} is already matched in group {}".format(user, group))
+        reply(f"User {user} is already matched in group {group}")
     elif group_exists:
-        reply("User {} added to group {}".format(user, group))
+        reply(f"User {user} added to group {group}")
         if logchannel:
-                message("{} used adduser to add {} to {}.".format(nick, user, group), logchannel)
+                message(f"{nick} used adduser to add {user} to {group}.", logchannel)
     else:
-        reply("Group {} created with user {}".format(group, user))
+        reply(f"Group {group} created with user {user}")
         if logchannel:
-                message("{} used adduser to create group {} and add {} to it.".format(nick, group, user), logchannel)
+                message(f"{nick} used adduser to create group {group} and add {user} to it.", logchannel)
 
     if changed:
-        bot.config.save_config()
-        permission_manager.reload()
+        permission_manager.mark_dirty()
 
 
 @asyncio.coroutine
@@ -239,23 +253,19 @@ def restart(text, bot):
         yield from bot.restart()
 
 
-@asyncio.coroutine
 @hook.command(permissions=["botcontrol", "snoonetstaff"])
 def join(text, conn, nick, message, notice):
     """<channel> - joins <channel>
     :type text: str
     :type conn: cloudbot.client.Client
     """
-    for target in text.split():
-        if not target.startswith("#"):
-            target = "#{}".format(target)
+    for target in map(_chanify, text.split()):
         if logchannel:
-            message("{} used JOIN to make me join {}.".format(nick, target), logchannel)
-        notice("Attempting to join {}...".format(target))
+            message(f"{nick} used JOIN to make me join {target}.", logchannel)
+        notice(f"Attempting to join {target}...")
         conn.join(target)
 
 
-@asyncio.coroutine
 @hook.command(permissions=["botcontrol", "snoonetstaff"], autohelp=False)
 def part(text, conn, nick, message, chan, notice):
     """[#channel] - parts [#channel], or the caller's channel if no channel is specified
@@ -267,16 +277,13 @@ def part(text, conn, nick, message, chan, notice):
         targets = text
     else:
         targets = chan
-    for target in targets.split():
-        if not target.startswith("#"):
-            target = "#{}".format(target)
+    for target in map(_chanify, targets.split()):
         if logchannel:
-            message("{} used PART to make me leave {}.".format(nick, target), logchannel)
-        notice("Attempting to leave {}...".format(target))
+            message(f"{nick} used PART to make me leave {target}.", logchannel)
+        notice(f"Attempting to leave {target}...")
         conn.part(target)
 
 
-@asyncio.coroutine
 @hook.command(autohelp=False, permissions=["botcontrol"])
 def cycle(text, conn, chan, notice):
     """[#channel] - cycles [#channel], or the caller's channel if no channel is specified
@@ -288,15 +295,12 @@ def cycle(text, conn, chan, notice):
         targets = text
     else:
         targets = chan
-    for target in targets.split():
-        if not target.startswith("#"):
-            target = "#{}".format(target)
-        notice("Attempting to cycle {}...".format(target))
+    for target in map(_chanify, targets.split()):
+        notice(f"Attempting to cycle {target}...")
         conn.part(target)
         conn.join(target)
 
 
-@asyncio.coroutine
 @hook.command(permissions=["botcontrol"])
 def nick(text, conn, notice, is_nick_valid):
     """<nick> - changes my nickname to <nick>
@@ -304,14 +308,13 @@ def nick(text, conn, notice, is_nick_valid):
     :type conn: cloudbot.client.Client
     """
     if not is_nick_valid(text):
-        notice("Invalid username '{}'".format(text))
+        notice(f"Invalid username '{text}'")
         return
 
-    notice("Attempting to change nick to '{}'...".format(text))
+    notice(f"Attempting to change nick to '{text}'...")
     conn.set_nick(text)
 
 
-@asyncio.coroutine
 @hook.command(permissions=["botcontrol"])
 def raw(text, conn, notice):
     """<command> - sends <command> as a raw IRC command
@@ -322,9 +325,8 @@ def raw(text, conn, notice):
     conn.send(text)
 
 
-@asyncio.coroutine
 @hook.command(permissions=["botcontrol", "snoonetstaff"])
-def say(text, conn, chan, nick, message):
+def say(text, conn, chan, nick, message, notice):
     """[#channel] <message> - says <message> to [#channel], or to the caller's channel if no channel is specified
     :type text: str
     :type conn: cloudbot.client.Client
@@ -332,35 +334,36 @@ def say(text, conn, chan, nick, message):
     """
     text = text.strip()
     if text.startswith("#"):
-        split = text.split(None, 1)
-        channel = split[0]
-        text = split[1]
+        split = _parse_args(text, 2, 2, notice, rest=True)
+        if split is None:
+            return
+
+        channel, text = split
     else:
         channel = chan
-        text = text
     if logchannel:
-            message("{} used SAY to make me SAY \"{}\" in {}.".format(nick, text, channel), logchannel)
+            message(f'{nick} used SAY to make me SAY "{text}" in {channel}.', logchannel)
     conn.message(channel, text)
 
 
-@asyncio.coroutine
 @hook.command("message", "sayto", permissions=["botcontrol", "snoonetstaff"])
-def message(text, conn, nick, message):
+def message(text, conn, nick, message, notice):
     """<name> <message> - says <message> to <name>
     :type text: str
     :type conn: cloudbot.client.Client
     """
-    split = text.split(None, 1)
-    channel = split[0]
-    text = split[1]
+    split = _parse_args(text, 2, 2, notice, rest=True)
+    if split is None:
+        return
+
+    channel, text = split
     if logchannel:
-            message("{} used MESSAGE to make me SAY \"{}\" in {}.".format(nick, text, channel), logchannel)
+            message(f'{nick} used MESSAGE to make me SAY "{text}" in {channel}.', logchannel)
     conn.message(channel, text)
 
 
-@asyncio.coroutine
 @hook.command("me", "act", permissions=["botcontrol", "snoonetstaff"])
-def me(text, conn, chan, message, nick):
+def me(text, conn, chan, message, nick, notice):
     """[#channel] <action> - acts out <action> in a [#channel], or in the current channel of none is specified
     :type text: str
     :type conn: cloudbot.client.Client
@@ -368,24 +371,23 @@ def me(text, conn, chan, message, nick):
     """
     text = text.strip()
     if text.startswith("#"):
-        split = text.split(None, 1)
-        channel = split[0]
-        text = split[1]
+        split = _parse_args(text, 2, 2, notice, rest=True)
+        if split is None:
+            return
+
+        channel, text = split
     else:
         channel = chan
-        text = text
     if logchannel:
-            message("{} used ME to make me ACT \"{}\" in {}.".format(nick, text, channel), logchannel)
+            message(f'{nick} used ME to make me ACT "{text}" in {channel}.', logchannel)
     conn.ctcp(channel, "ACTION", text)
 
-@asyncio.coroutine
 @hook.command(autohelp=False, permissions=["botcontrol"])
 def listchans(conn, chan, message, notice):
     """-- Lists the current channels the bot is in"""
     chans = ', '.join(sorted(conn.channels, key=lambda x: x.strip('#').lower()))
-    lines = formatting.chunk_str("I am currently in: {}".format(chans))
+    lines = formatting.chunk_str(f"I am currently in: {chans}")
+    # notice the caller in a channel, message them in private
+    send = notice if chan[:1] == "#" else message
     for line in lines:
-        if chan[:1] == "#":
-            notice(line)
-        else:
-            message(line)
+        send(line)
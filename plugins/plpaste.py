@@ -12,7 +12,7 @@ def plpaste(text, bot):
     """
     if text in bot.plugin_manager.commands:
         file_path = bot.plugin_manager.commands[text].plugin.file_path
-        with open(file_path) as f:
+        with open(str(file_path)) as f:
             return web.paste(f.read(), ext='py')
     elif text + ".py" in listdir('plugins/'):
         with open('plugins/{}.py'.format(text)) as f:
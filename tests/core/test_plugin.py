@@ -0,0 +1,289 @@
+import asyncio
+import re
+from collections import defaultdict
+from types import SimpleNamespace
+
+import pytest
+
+from cloudbot import hook
+from cloudbot.hook import Priority
+from cloudbot.plugin import PluginManager, SortedHookList, OnCapAvaliableHook, _compile_regex_union
+
+# a mix of the kinds of patterns used by the regex hooks in plugins/
+test_regexes = [
+    re.compile(r'(.*:)//(www.speedtest.net|speedtest.net)(.*)/result(.*)', re.I),
+    re.compile(r'(?i)cheer(s|ing)? ?(up)?'),
+    re.compile(r'vimeo.com/([0-9]+)'),
+    re.compile(r'(.*:)//(imdb.com|www.imdb.com)(:[0-9]+)?(.*)', re.I),
+    re.compile(r'^\?(?P<name>\w+)(?:\s+(?P<args>.*))?$'),
+    re.compile(r'^(\S+)\+\+$'),
+    re.compile(r'(?:youtube.*?(?:v=|/v/)|youtu\.be/|yooouuutuuube.*?id=)([-_a-zA-Z0-9]+)', re.I),
+    re.compile(r'^[sS]/(.*/.*(?:/[igx]{,4})?)\S*$'),
+    re.compile(r'^line one$', re.M),
+    re.compile(r"""
+        ^\#             # a literal hash
+        (?P<tag>\w+)    # the tag itself
+    """, re.X),
+    re.compile(r'twitch\.tv/(\w+)  # trailing comment', re.X),
+]
+
+test_texts = [
+    "http://www.speedtest.net/my-result/123",
+    "CHEERS everyone",
+    "check out vimeo.com/12345",
+    "https://www.imdb.com/title/tt0111161/",
+    "?factoid some args",
+    "karma++",
+    "https://youtu.be/dQw4w9WgXcQ",
+    "s/foo/bar/",
+    "first\nline one\nthird",
+    "#hashtag",
+    "watch twitch.tv/somebody",
+    "nothing to see here",
+    "",
+]
+
+
+class DummyBot:
+    config = {}
+
+
+def _matches_any(regexes, text):
+    return any(regex.search(text) for regex in regexes)
+
+
+class TestRegexUnion:
+    def test_matches_like_each_regex(self):
+        """
+        tests that the combined regex matches exactly when one of the regexes it was built from matches
+        """
+        union = _compile_regex_union(test_regexes)
+        assert union is not None
+        for text in test_texts:
+            assert (union.search(text) is not None) == _matches_any(test_regexes, text), text
+
+    def test_ignorecase(self):
+        """
+        tests that an inline (?i) flag only applies to its own regex
+        """
+        union = _compile_regex_union([re.compile(r'(?i)hello'), re.compile(r'bye')])
+        assert union.search("HELLO")
+        assert union.search("bye")
+        assert not union.search("BYE")
+
+    def test_multiline(self):
+        """
+        tests that re.M only applies to its own regex
+        """
+        union = _compile_regex_union([re.compile(r'^b$', re.M), re.compile(r'^c$')])
+        assert union.search("a\nb\nc")
+        assert not union.search("a\nc\nd")
+
+    def test_verbose_trailing_comment(self):
+        """
+        tests that a comment at the end of a verbose regex doesn't swallow the rest of the combined pattern
+        """
+        union = _compile_regex_union([re.compile(r'foo  # a comment', re.X), re.compile(r'bar baz')])
+        assert union.search("foo")
+        assert union.search("bar baz")
+        assert not union.search("barbaz")
+
+    def test_backreference(self):
+        """
+        tests that regexes using numbered backreferences aren't combined
+        """
+        assert _compile_regex_union([re.compile(r'(a)b'), re.compile(r'(\w)\1')]) is None
+
+    def test_conditional_group(self):
+        """
+        tests that regexes using conditional groups aren't combined
+        """
+        assert _compile_regex_union([re.compile(r'(<)?a(?(1)>)')]) is None
+
+    def test_duplicate_group_names(self):
+        """
+        tests that regexes sharing a group name aren't combined
+        """
+        assert _compile_regex_union([re.compile(r'(?P<name>a)'), re.compile(r'(?P<name>b)')]) is None
+
+    def test_bytes(self):
+        """
+        tests that bytes regexes aren't combined
+        """
+        assert _compile_regex_union([re.compile(rb'abc')]) is None
+
+
+class TestRegexCouldMatch:
+    def _manager(self, regexes):
+        manager = PluginManager(DummyBot())
+        manager.regex_hooks = SortedHookList(
+            SimpleNamespace(regexes=[regex], priority=Priority.NORMAL) for regex in regexes
+        )
+        return manager
+
+    def test_could_match(self):
+        """
+        tests regex_could_match against searching with each registered regex
+        """
+        manager = self._manager(test_regexes)
+        for text in test_texts:
+            assert manager.regex_could_match(text) == _matches_any(test_regexes, text), text
+
+    def test_fallback(self):
+        """
+        tests that regex_could_match lets every line through when the regexes can't be combined
+        """
+        manager = self._manager([re.compile(r'(\w)\1')])
+        assert manager.regex_could_match("nothing to see here")
+
+    def test_no_hooks(self):
+        """
+        tests regex_could_match with no regex hooks registered
+        """
+        manager = self._manager([])
+        assert not manager.regex_could_match("anything")
+
+    def test_stale(self):
+        """
+        tests that the combined regex is rebuilt once the registered hooks change
+        """
+        manager = self._manager([re.compile(r'foo')])
+        assert not manager.regex_could_match("bar")
+        manager.regex_hooks.append(SimpleNamespace(regexes=[re.compile(r'bar')], priority=Priority.NORMAL))
+        manager._regex_union_stale = True
+        assert manager.regex_could_match("bar")
+
+
+def _hook(name, priority=Priority.NORMAL):
+    return SimpleNamespace(name=name, priority=priority)
+
+
+def _names(hooks):
+    return [hook.name for hook in hooks]
+
+
+class TestSortedHookList:
+    def test_ordering(self):
+        """
+        tests that hooks are kept sorted by priority, whatever order they're added in
+        """
+        hooks = SortedHookList()
+        hooks.append(_hook("normal"))
+        hooks.append(_hook("lowest", Priority.LOWEST))
+        hooks.append(_hook("highest", Priority.HIGHEST))
+        hooks.append(_hook("high", Priority.HIGH))
+        hooks.append(_hook("low", Priority.LOW))
+        assert _names(hooks) == ["highest", "high", "normal", "low", "lowest"]
+
+    def test_stable(self):
+        """
+        tests that hooks with the same priority stay in the order they were added
+        """
+        hooks = SortedHookList([_hook("a"), _hook("b", Priority.HIGH), _hook("c"), _hook("d", Priority.HIGH)])
+        hooks.append(_hook("e"))
+        assert _names(hooks) == ["b", "d", "a", "c", "e"]
+
+    def test_remove(self):
+        """
+        tests removing hooks, including from the middle of a run of hooks with the same priority
+        """
+        hook_list = [_hook(str(i), Priority.HIGH if i % 3 else Priority.NORMAL) for i in range(9)]
+        hooks = SortedHookList(hook_list)
+        hooks.remove(hook_list[4])
+        hooks.remove(hook_list[3])
+        hooks.remove(hook_list[8])
+        assert _names(hooks) == ["1", "2", "5", "7", "0", "6"]
+        assert len(hooks) == 6
+        assert hook_list[4] not in hooks
+        assert hook_list[5] in hooks
+
+    def test_remove_equal_hooks(self):
+        """
+        tests that remove() goes by identity, not equality
+        """
+        first, second = _hook("same"), _hook("same")
+        hooks = SortedHookList([first, second])
+        hooks.remove(second)
+        assert hooks.snapshot == (first,)
+
+    def test_append_twice(self):
+        """
+        tests that adding a hook which is already in the list raises ValueError and leaves the list as it was
+        """
+        first, second = _hook("a"), _hook("b")
+        hooks = SortedHookList([first, second])
+        with pytest.raises(ValueError):
+            hooks.append(first)
+
+        assert _names(hooks) == ["a", "b"]
+        hooks.remove(first)
+        assert first not in hooks
+        assert len(hooks) == 1
+
+    def test_remove_missing(self):
+        """
+        tests that removing a hook that isn't in the list raises ValueError
+        """
+        hook = _hook("a")
+        hooks = SortedHookList([hook])
+        hooks.remove(hook)
+        with pytest.raises(ValueError):
+            hooks.remove(hook)
+
+        with pytest.raises(ValueError):
+            hooks.remove(_hook("b"))
+
+    def test_readd(self):
+        """
+        tests that a removed hook goes after existing hooks with the same priority when added again
+        """
+        hook_list = [_hook("a"), _hook("b"), _hook("c")]
+        hooks = SortedHookList(hook_list)
+        hooks.remove(hook_list[0])
+        hooks.append(hook_list[0])
+        assert _names(hooks) == ["b", "c", "a"]
+
+    def test_modify_while_iterating(self):
+        """
+        tests that changing the list while iterating over it doesn't affect the running iteration
+        """
+        hook_list = [_hook("a"), _hook("b")]
+        hooks = SortedHookList(hook_list)
+        seen = []
+        for hook in hooks:
+            seen.append(hook.name)
+            hooks.append(_hook(hook.name * 2))
+            hooks.remove(hook)
+
+        assert seen == ["a", "b"]
+        assert _names(hooks) == ["aa", "bb"]
+
+
+class TestCapHooks:
+    def test_caps_differing_by_case(self):
+        """
+        tests that a cap hook listing the same cap in different cases is registered and unregistered once
+        """
+        @hook.on_cap_available("sasl", "SASL")
+        def cap_hook():
+            pass
+
+        plugin = SimpleNamespace(
+            title="test", file_path="test.py", tasks=[], hooks=defaultdict(list), unregister_tables=lambda bot: None
+        )
+        cap_hook = OnCapAvaliableHook(plugin, cap_hook._cloudbot_hook["on_cap_available"])
+        plugin.hooks["on_cap_available"].append(cap_hook)
+
+        manager = PluginManager(DummyBot())
+        manager.plugins[plugin.file_path] = plugin
+        manager._register_cap_available_hook(cap_hook)
+        assert list(manager.cap_hooks["on_available"]) == ["sasl"]
+        assert manager.cap_hooks["on_available"]["sasl"].snapshot == (cap_hook,)
+
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(manager._unload_plugin(plugin))
+        finally:
+            loop.close()
+
+        assert not manager.cap_hooks["on_available"]
@@ -0,0 +1,124 @@
+from plugins import admin_bot
+from plugins.admin_bot import _parse_args, message, say, me
+
+too_many = "Too many arguments"
+not_enough = "Not enough arguments"
+
+
+class DummyConn:
+    def __init__(self):
+        self.sent = []
+
+    def message(self, target, text):
+        self.sent.append(("message", target, text))
+
+    def ctcp(self, target, ctcp_type, text):
+        self.sent.append((ctcp_type, target, text))
+
+
+class TestParseArgs:
+    def setup_method(self):
+        self.notices = []
+
+    def test_bounds(self):
+        """
+        tests that any number of arguments between the bounds is accepted
+        """
+        assert _parse_args("user", 1, 2, self.notices.append) == ["user"]
+        assert _parse_args("user group", 1, 2, self.notices.append) == ["user", "group"]
+        assert _parse_args("  user   group  ", 2, 2, self.notices.append) == ["user", "group"]
+        assert self.notices == []
+
+    def test_too_many(self):
+        """
+        tests text with more arguments than allowed
+        """
+        assert _parse_args("user group extra", 1, 2, self.notices.append) is None
+        assert _parse_args("a b c d e", 2, 2, self.notices.append) is None
+        assert self.notices == [too_many, too_many]
+
+    def test_not_enough(self):
+        """
+        tests text with fewer arguments than required
+        """
+        assert _parse_args("user", 2, 2, self.notices.append) is None
+        assert self.notices == [not_enough]
+
+    def test_empty(self):
+        """
+        tests empty and whitespace-only text
+        """
+        assert _parse_args("", 1, 2, self.notices.append) is None
+        assert _parse_args("   \t ", 1, 2, self.notices.append) is None
+        assert self.notices == [not_enough, not_enough]
+
+    def test_rest(self):
+        """
+        tests that with rest=True the last argument takes the rest of the text
+        """
+        assert _parse_args("#chan hello  there ", 2, 2, self.notices.append, rest=True) == ["#chan", "hello  there "]
+        assert _parse_args("#chan", 2, 2, self.notices.append, rest=True) is None
+        assert _parse_args("   ", 2, 2, self.notices.append, rest=True) is None
+        assert self.notices == [not_enough, not_enough]
+
+
+class TestMessageCommands:
+    def setup_method(self):
+        self.notices = []
+        self.messages = []
+        self.conn = DummyConn()
+
+    def _message(self, text, target):
+        self.messages.append((target, text))
+
+    def test_message(self):
+        """
+        tests sending a message to a target
+        """
+        message("somenick hi there", self.conn, "admin", self._message, self.notices.append)
+        assert self.conn.sent == [("message", "somenick", "hi there")]
+        assert self.messages == []
+
+    def test_message_logged(self, monkeypatch):
+        """
+        tests that message reports to the log channel when one is set
+        """
+        monkeypatch.setattr(admin_bot, "logchannel", "#log")
+        message("somenick hi there", self.conn, "admin", self._message, self.notices.append)
+        assert self.messages == [("#log", 'admin used MESSAGE to make me SAY "hi there" in somenick.')]
+        assert self.conn.sent == [("message", "somenick", "hi there")]
+
+    def test_message_missing_text(self):
+        """
+        tests that message notices the caller instead of failing when there is no message
+        """
+        message("somenick", self.conn, "admin", self._message, self.notices.append)
+        assert self.notices == [not_enough]
+        assert self.conn.sent == []
+        assert self.messages == []
+
+    def test_say_missing_text(self):
+        """
+        tests that say notices the caller when given a channel but no message
+        """
+        say("#chan ", self.conn, "#here", "admin", self._message, self.notices.append)
+        assert self.notices == [not_enough]
+        assert self.conn.sent == []
+        assert self.messages == []
+
+    def test_say_current_channel(self):
+        """
+        tests that say goes to the caller's channel when no channel is given
+        """
+        say("hello there", self.conn, "#here", "admin", self._message, self.notices.append)
+        assert self.conn.sent == [("message", "#here", "hello there")]
+        assert self.messages == []
+
+    def test_me_missing_text(self):
+        """
+        tests that me notices the caller when given a channel but no action
+        """
+        me("#chan", self.conn, "#here", self._message, "admin", self.notices.append)
+        assert self.notices == [not_enough]
+        assert self.conn.sent == []
+        assert self.messages == []